@@ -1,6 +1,10 @@
 import pygame
 import sys
 import random
+from bisect import bisect
+from functools import lru_cache
+import numpy as np
+from numba import njit
 from enum import Enum, auto
 from typing import List, Tuple, Optional, Set
 
@@ -33,6 +37,11 @@ class Direction(Enum):
     DOWN = 2
     LEFT = 3
 
+# Neighbor offsets and opposite direction, indexed by Direction.value.
+DX = (0, 1, 0, -1)
+DY = (-1, 0, 1, 0)
+OPPOSITE = (2, 3, 0, 1)
+
 ROTATIONS = {
     TileType.STRAIGHT: 2,
     TileType.ELBOW: 4,
@@ -94,6 +103,106 @@ CONNECTION_MAPS = {
     ]
 }
 
+# Unrotated connection bitmask per power-source pattern. Rotating a mask by
+# r steps is a 4-bit circular shift: ((m << r) | (m >> (4 - r))) & 0xF.
+POWER_SOURCE_BASE_MASKS = tuple(
+    sum(1 << d.value for d in directions) for directions in POWER_SOURCE_CONNECTIONS
+)
+
+def _rotate_mask(mask: int, rotation: int) -> int:
+    return ((mask << rotation) | (mask >> (4 - rotation))) & 0xF
+
+def _build_conn_lut() -> np.ndarray:
+    # CONN_LUT[tile_type.value, rotation, power_pattern] -> 4-bit bitmask of
+    # open directions (bit0=UP, bit1=RIGHT, bit2=DOWN, bit3=LEFT). Built once
+    # at import so rotation and connectivity checks become table lookups
+    # instead of list building and enum arithmetic.
+    lut = np.zeros((len(TileType) + 1, 4, len(POWER_SOURCE_CONNECTIONS)), dtype=np.uint8)
+    for tile_type, patterns in CONNECTION_MAPS.items():
+        if tile_type == TileType.POWER_SOURCE:
+            continue
+        for rotation in range(4):
+            mask = 0
+            for direction in patterns[rotation % len(patterns)]:
+                mask |= 1 << direction.value
+            lut[tile_type.value, rotation, :] = mask
+    for rotation in range(4):
+        for pattern, base in enumerate(POWER_SOURCE_BASE_MASKS):
+            lut[TileType.POWER_SOURCE.value, rotation, pattern] = _rotate_mask(base, rotation)
+    return lut
+
+CONN_LUT = _build_conn_lut()
+
+# Rotation count per TileType.value, for broadcast lookups over tile_type_arr.
+MAX_ROT_LUT = np.ones(len(TileType) + 1, dtype=np.uint8)
+for _tile_type in TileType:
+    MAX_ROT_LUT[_tile_type.value] = ROTATIONS[_tile_type]
+del _tile_type
+
+def _build_fix_lut() -> tuple:
+    # FIX_LUT[neighbor_mask] -> (tile_type, rotation) of the shape whose
+    # connections exactly match the 4-bit neighbor bitmask; mask 0 maps to
+    # EMPTY. Shape masks are unique, so inverting CONNECTION_MAPS covers
+    # all 16 entries unambiguously.
+    lut = [(TileType.EMPTY, 0)] * 16
+    for tile_type in (TileType.LIGHT_BULB, TileType.STRAIGHT, TileType.ELBOW,
+                      TileType.T_JUNCTION, TileType.CROSS):
+        for rotation, directions in enumerate(CONNECTION_MAPS[tile_type]):
+            mask = sum(1 << d.value for d in directions)
+            lut[mask] = (tile_type, rotation)
+    return tuple(lut)
+
+FIX_LUT = _build_fix_lut()
+
+@lru_cache(maxsize=None)
+def _mask_connections(mask: int) -> Tuple[Direction, ...]:
+    # Shared Direction tuple per bitmask. The mask already encodes tile
+    # type, rotation and power pattern, so 16 entries cover every tile and
+    # get_connections never allocates after warm-up.
+    return tuple(Direction(d) for d in range(4) if (mask >> d) & 1)
+
+# Pipe types drawn during generation with weights 4:4:2:1, as a precomputed
+# cumulative table so the hot loop avoids random.choices' per-call prefix sum.
+_PIPE_TYPES = (TileType.STRAIGHT, TileType.ELBOW, TileType.T_JUNCTION, TileType.CROSS)
+_PIPE_CUM = (4, 8, 10, 11)
+
+def _nibble_repeat(nibble: int, width: int) -> int:
+    # A uint64 word with `nibble` repeated in each of `width` 4-bit lanes.
+    return sum(nibble << (4 * i) for i in range(width))
+
+@njit(cache=True)
+def _propagate(conn_flat, neighbors, sources, n_cells):
+    # Iterative BFS over the flat connection bitmasks, compiled to native
+    # code. Neighbor lookup is a single load from the precomputed index
+    # table (-1 marks off-board), so the inner loop carries no coordinate
+    # arithmetic or bounds checks. The queue is a preallocated buffer:
+    # every cell is enqueued at most once, so n_cells slots suffice.
+    powered = np.zeros(n_cells, dtype=np.uint8)
+    queue = np.empty(n_cells, dtype=np.int32)
+    head = 0
+    tail = 0
+    for i in range(sources.shape[0]):
+        idx = sources[i]
+        if powered[idx] == 0:
+            powered[idx] = 1
+            queue[tail] = idx
+            tail += 1
+    while head < tail:
+        idx = queue[head]
+        head += 1
+        mask = conn_flat[idx]
+        for d in range(4):
+            if mask & (1 << d) == 0:
+                continue
+            ni = neighbors[idx, d]
+            if ni < 0:
+                continue
+            if powered[ni] == 0 and conn_flat[ni] & (1 << OPPOSITE[d]):
+                powered[ni] = 1
+                queue[tail] = ni
+                tail += 1
+    return powered
+
 class Tile:
     def __init__(self, tile_type: TileType, rotation: int = 0):
         self.tile_type = tile_type
@@ -104,61 +213,130 @@ class Tile:
         self.power_connection_pattern = None
         if tile_type == TileType.POWER_SOURCE:
             self.power_connection_pattern = random.randint(0, 12)
-    
-    def rotate(self):
-       if self.max_rotation > 1:
-           self.rotation = (self.rotation + 1) % self.max_rotation
-           return True
-       return False
+        self.board = None
+        self.pos = (0, 0)
+        self.mask = 0
+        self.refresh_mask()
 
+    def refresh_mask(self):
+        # Recompute the cached connection bitmask; must be called whenever
+        # tile_type, rotation or power_connection_pattern changes.
+        if self.tile_type == TileType.POWER_SOURCE and self.power_connection_pattern is not None:
+            self.power_base_mask = POWER_SOURCE_BASE_MASKS[self.power_connection_pattern]
+            self.mask = _rotate_mask(self.power_base_mask, self.rotation)
+        else:
+            self.mask = int(CONN_LUT[self.tile_type.value, self.rotation, 0])
 
-    def get_connections(self) -> List[Direction]:
-       if self.tile_type == TileType.POWER_SOURCE and self.power_connection_pattern is not None:
-           base_directions = POWER_SOURCE_CONNECTIONS[self.power_connection_pattern]
-           return [Direction((d.value + self.rotation) % 4) for d in base_directions]
-       return CONNECTION_MAPS[self.tile_type][self.rotation]
+    def rotate(self):
+        if self.max_rotation > 1:
+            self.rotation = (self.rotation + 1) % self.max_rotation
+            self.refresh_mask()
+            if self.board is not None:
+                x, y = self.pos
+                self.board.conn_mask[y, x] = self.mask
+            return True
+        return False
 
+    def get_connections(self) -> Tuple[Direction, ...]:
+        return _mask_connections(self.mask)
 
     def is_connected_to(self, direction: Direction) -> bool:
-        return direction in self.get_connections()
+        return (self.mask >> direction.value) & 1 == 1
 
 class PuzzleGame:
     def __init__(self, width: int, height: int):
         self.width = width
         self.height = height
-        self.grid = [[Tile(TileType.EMPTY) for _ in range(width)] for _ in range(height)]
+        self.conn_mask = np.zeros((height, width), dtype=np.uint8)
+        self.tile_type_arr = np.full((height, width), TileType.EMPTY.value, dtype=np.uint8)
+        # Flat index of each cell's neighbor per direction, -1 for off-board.
+        # Built once so the BFS kernel needs no coordinate arithmetic.
+        self.neighbors = np.full((height * width, 4), -1, dtype=np.int32)
+        for y in range(height):
+            for x in range(width):
+                for d in range(4):
+                    nx, ny = x + DX[d], y + DY[d]
+                    if 0 <= nx < width and 0 <= ny < height:
+                        self.neighbors[y * width + x, d] = ny * width + nx
+        # SWAR leak-check constants: each board row packs into one uint64
+        # (width nibbles of 4 connection bits), so these select one
+        # direction bit across all lanes of a packed row at once.
+        self._nib_shifts = np.uint64(4) * np.arange(width, dtype=np.uint64)
+        self._lane_up = np.uint64(_nibble_repeat(1 << Direction.UP.value, width))
+        self._lane_right = np.uint64(_nibble_repeat(1 << Direction.RIGHT.value, width))
+        self._lane_down = np.uint64(_nibble_repeat(1 << Direction.DOWN.value, width))
+        self._lane_left = np.uint64(_nibble_repeat(1 << Direction.LEFT.value, width))
+        self.grid = [[None] * width for _ in range(height)]
+        for y in range(height):
+            for x in range(width):
+                self.set_tile(x, y, Tile(TileType.EMPTY))
         self.power_sources = []
         self.bulbs = []
+        self._bulbs_yx = np.empty((0, 2), dtype=np.intp)
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Light Bulb Power Puzzle")
         self.font = pygame.font.SysFont('Arial', 24)
         self.is_solved = False
+        self._bg = self._render_background()
+        self._tile_cache = {}
+        self._dirty = set()
+        self._needs_full_redraw = True
+        self._solved_shown = False
+
+    def _render_background(self) -> pygame.Surface:
+        bg = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        bg.fill(BACKGROUND_COLOR)
+
+        for x in range(self.width + 1):
+            pygame.draw.line(bg, GRID_COLOR,
+                            (x * TILE_SIZE, 0),
+                            (x * TILE_SIZE, SCREEN_HEIGHT), 2)
+
+        for y in range(self.height + 1):
+            pygame.draw.line(bg, GRID_COLOR,
+                            (0, y * TILE_SIZE),
+                            (SCREEN_WIDTH, y * TILE_SIZE), 2)
+        return bg
+
+    def set_tile(self, x: int, y: int, tile: Tile):
+        tile.board = self
+        tile.pos = (x, y)
+        self.grid[y][x] = tile
+        self.sync_tile(x, y)
+
+    def sync_tile(self, x: int, y: int):
+        tile = self.grid[y][x]
+        tile.refresh_mask()
+        self.tile_type_arr[y, x] = tile.tile_type.value
+        self.conn_mask[y, x] = tile.mask
+
+    def _reset_grid(self):
+        # Reuse the existing Tile objects and arrays rather than allocating
+        # a fresh width*height grid on every regeneration.
+        self.conn_mask.fill(0)
+        self.tile_type_arr.fill(TileType.EMPTY.value)
+        for row in self.grid:
+            for tile in row:
+                tile.tile_type = TileType.EMPTY
+                tile.max_rotation = ROTATIONS[TileType.EMPTY]
+                tile.rotation = 0
+                tile.is_powered = False
+                tile.used_in_solution = False
+                tile.power_connection_pattern = None
+                tile.mask = 0
 
     def is_valid_position(self, x: int, y: int) -> bool:
         return 0 <= x < self.width and 0 <= y < self.height
 
     def get_neighbor_position(self, x: int, y: int, direction: Direction) -> Tuple[int, int]:
-        if direction == Direction.UP:
-            return x, y - 1
-        elif direction == Direction.RIGHT:
-            return x + 1, y
-        elif direction == Direction.DOWN:
-            return x, y + 1
-        elif direction == Direction.LEFT:
-            return x - 1, y
-        return x, y
+        d = direction.value
+        return x + DX[d], y + DY[d]
 
     def get_opposite_direction(self, direction: Direction) -> Direction:
-        opposites = {
-            Direction.UP: Direction.DOWN,
-            Direction.RIGHT: Direction.LEFT,
-            Direction.DOWN: Direction.UP,
-            Direction.LEFT: Direction.RIGHT
-        }
-        return opposites[direction]
+        return Direction(OPPOSITE[direction.value])
 
     def generate_puzzle(self, difficulty: int = 1):
-        self.grid = [[Tile(TileType.EMPTY) for _ in range(self.width)] for _ in range(self.height)]
+        self._reset_grid()
         self.bulbs = []
         self.power_sources = []
         
@@ -167,13 +345,17 @@ class PuzzleGame:
         
         available_positions = [(x, y) for y in range(self.height) for x in range(self.width)]
         random.shuffle(available_positions)
-        
+        # The shuffled list only provides the pop ordering for power sources;
+        # membership tests and removals go through this parallel set.
+        available_set = set(available_positions)
+
         power_source_positions = []
         for i in range(num_sources):
             if not available_positions:
                 break
             x, y = available_positions.pop(0)
-            
+            available_set.discard((x, y))
+
             connections_count = random.randint(1, 4)
             
             if connections_count == 1:
@@ -185,38 +367,46 @@ class PuzzleGame:
             else:
                 source_type = 12
             
-            self.grid[y][x] = Tile(TileType.POWER_SOURCE, 0)
-            self.grid[y][x].power_connection_pattern = source_type
-            
+            source = Tile(TileType.POWER_SOURCE, 0)
+            source.power_connection_pattern = source_type
+            self.set_tile(x, y, source)
+
             power_source_positions.append((x, y))
             self.power_sources.append((x, y))
         
         connected = set(power_source_positions)
         frontier = list(power_source_positions)
-        
+        # Position -> index in the frontier list, so dead-end cells can be
+        # removed with an O(1) swap-and-pop instead of lazy deletion.
+        frontier_idx = {pos: i for i, pos in enumerate(frontier)}
+
         bulb_positions = []
-        while len(bulb_positions) < num_bulbs and frontier and available_positions:
+        while len(bulb_positions) < num_bulbs and frontier and available_set:
             x, y = random.choice(frontier)
             current_tile = self.grid[y][x]
-            
+
             possible_connections = []
             for direction in current_tile.get_connections():
                 nx, ny = self.get_neighbor_position(x, y, direction)
                 if self.is_valid_position(nx, ny) and (nx, ny) not in connected:
                     possible_connections.append((direction, nx, ny))
-            
+
             if not possible_connections:
-                frontier.remove((x, y))
+                i = frontier_idx.pop((x, y))
+                last = frontier.pop()
+                if i < len(frontier):
+                    frontier[i] = last
+                    frontier_idx[last] = i
                 continue
                 
             direction, nx, ny = random.choice(possible_connections)
             connected.add((nx, ny))
             
-            if (nx, ny) in available_positions:
-                available_positions.remove((nx, ny))
-                
+            available_set.discard((nx, ny))
+
+            frontier_idx[(nx, ny)] = len(frontier)
             frontier.append((nx, ny))
-                
+
             opposite_dir = self.get_opposite_direction(direction)
             
             place_bulb = len(bulb_positions) < num_bulbs and random.random() < 0.3
@@ -232,307 +422,298 @@ class PuzzleGame:
                 elif opposite_dir == Direction.LEFT:
                     bulb_rotation = 3
                     
-                self.grid[ny][nx] = Tile(TileType.LIGHT_BULB, bulb_rotation)
+                self.set_tile(nx, ny, Tile(TileType.LIGHT_BULB, bulb_rotation))
                 bulb_positions.append((nx, ny))
                 self.bulbs.append((nx, ny))
             else:
-                pipe_types = [TileType.STRAIGHT, TileType.ELBOW, TileType.T_JUNCTION, TileType.CROSS]
-                pipe_weights = [4, 4, 2, 1]
-                pipe_type = random.choices(pipe_types, weights=pipe_weights)[0]
-                
-                self.grid[ny][nx] = Tile(pipe_type)
-                
-                valid_rotations = []
-                for rot in range(ROTATIONS[pipe_type]):
-                    self.grid[ny][nx].rotation = rot
-                    if self.grid[ny][nx].is_connected_to(opposite_dir):
-                        valid_rotations.append(rot)
-                
-                if valid_rotations:
-                    self.grid[ny][nx].rotation = random.choice(valid_rotations)
+                pipe_type = _PIPE_TYPES[bisect(_PIPE_CUM, random.random() * 11)]
+
+                valid_rotations = [
+                    rot for rot in range(ROTATIONS[pipe_type])
+                    if (int(CONN_LUT[pipe_type.value, rot, 0]) >> opposite_dir.value) & 1
+                ]
+                rotation = random.choice(valid_rotations) if valid_rotations else 0
+                self.set_tile(nx, ny, Tile(pipe_type, rotation))
         
+        # (y, x) index pairs for the bulb cells, for vectorized lit checks.
+        self._bulbs_yx = np.array(self.bulbs, dtype=np.intp).reshape(-1, 2)[:, ::-1]
+
         self.finalize_puzzle()
         self.update_power_flow()
-        
+
         for _ in range(3):
-            if not all(self.grid[y][x].used_in_solution for x, y in power_source_positions):
-                self.finalize_puzzle()
-                self.update_power_flow()
-        
+            if all(self.grid[y][x].used_in_solution for x, y in power_source_positions):
+                break
+            # finalize_puzzle reports whether it changed anything; if the
+            # grid is already stable, another BFS would be identical.
+            if not self.finalize_puzzle():
+                break
+            self.update_power_flow()
+
         self.randomize_rotations()
         self.update_power_flow()
+        self._needs_full_redraw = True
 
-    def finalize_puzzle(self):
+    def finalize_puzzle(self) -> bool:
+        changed = False
         for y in range(self.height):
             for x in range(self.width):
                 if self.grid[y][x].tile_type not in [TileType.POWER_SOURCE, TileType.LIGHT_BULB, TileType.EMPTY]:
-                    self.fix_pipe_connections(x, y)
+                    if self.fix_pipe_connections(x, y):
+                        changed = True
+        return changed
 
-    def fix_pipe_connections(self, x, y):
+    def fix_pipe_connections(self, x, y) -> bool:
         tile = self.grid[y][x]
-        neighbors = []
-        
-        for direction in Direction:
-            nx, ny = self.get_neighbor_position(x, y, direction)
-            if self.is_valid_position(nx, ny):
-                neighbor = self.grid[ny][nx]
-                opposite_dir = self.get_opposite_direction(direction)
-                if neighbor.tile_type != TileType.EMPTY and neighbor.is_connected_to(opposite_dir):
-                    neighbors.append(direction)
-        
-        if not neighbors:
-            tile.tile_type = TileType.EMPTY
-            return
-            
-        num_connections = len(neighbors)
-        
-        if num_connections == 1:
-            tile.tile_type = TileType.LIGHT_BULB
-            tile.max_rotation = ROTATIONS[tile.tile_type]
-            direction = neighbors[0]
-            if direction == Direction.UP:
-                tile.rotation = 0
-            elif direction == Direction.RIGHT:
-                tile.rotation = 1
-            elif direction == Direction.DOWN:
-                tile.rotation = 2
-            elif direction == Direction.LEFT:
-                tile.rotation = 3
-        elif num_connections == 2:
-            tile.tile_type = TileType.STRAIGHT if (
-                (Direction.UP in neighbors and Direction.DOWN in neighbors) or
-                (Direction.LEFT in neighbors and Direction.RIGHT in neighbors)
-            ) else TileType.ELBOW
-            tile.max_rotation = ROTATIONS[tile.tile_type]
-            
-            if tile.tile_type == TileType.STRAIGHT:
-                tile.rotation = 0 if Direction.UP in neighbors else 1
-            else:
-                if Direction.DOWN in neighbors and Direction.RIGHT in neighbors:
-                    tile.rotation = 0
-                elif Direction.LEFT in neighbors and Direction.DOWN in neighbors:
-                    tile.rotation = 1
-                elif Direction.UP in neighbors and Direction.LEFT in neighbors:
-                    tile.rotation = 2
-                elif Direction.UP in neighbors and Direction.RIGHT in neighbors:
-                    tile.rotation = 3
-        elif num_connections == 3:
-            tile.tile_type = TileType.T_JUNCTION
-            tile.max_rotation = ROTATIONS[tile.tile_type]
-            if Direction.LEFT in neighbors and Direction.RIGHT in neighbors and Direction.DOWN in neighbors:
-                tile.rotation = 0
-            elif Direction.UP in neighbors and Direction.DOWN in neighbors and Direction.LEFT in neighbors:
-                tile.rotation = 1
-            elif Direction.LEFT in neighbors and Direction.RIGHT in neighbors and Direction.UP in neighbors:
-                tile.rotation = 2
-            elif Direction.UP in neighbors and Direction.DOWN in neighbors and Direction.RIGHT in neighbors:
-                tile.rotation = 3
-        else:
-            tile.tile_type = TileType.CROSS
-            tile.max_rotation = ROTATIONS[tile.tile_type]
-            tile.rotation = 0
+
+        # Bitmask of directions whose neighbor connects back to this cell;
+        # an EMPTY neighbor has a zero mask and contributes nothing.
+        neighbor_mask = 0
+        for d in range(4):
+            nx, ny = x + DX[d], y + DY[d]
+            if self.is_valid_position(nx, ny) and (int(self.conn_mask[ny, nx]) >> OPPOSITE[d]) & 1:
+                neighbor_mask |= 1 << d
+
+        tile_type, rotation = FIX_LUT[neighbor_mask]
+        if tile.tile_type == tile_type and tile.rotation == rotation:
+            return False
+        tile.tile_type = tile_type
+        tile.max_rotation = ROTATIONS[tile_type]
+        tile.rotation = rotation
+        self.sync_tile(x, y)
+        return True
 
     def randomize_rotations(self):
-        for y in range(self.height):
-            for x in range(self.width):
-                tile = self.grid[y][x]
-                if tile.tile_type not in [TileType.EMPTY, TileType.POWER_SOURCE]:
-                    tile.max_rotation = ROTATIONS[tile.tile_type]
-                    tile.rotation = random.randint(0, tile.max_rotation - 1)
+        # Draw a rotation for every cell at once and refresh conn_mask with
+        # a single CONN_LUT indexing pass; EMPTY and POWER_SOURCE cells are
+        # masked out so they keep their rotation. Only the tile-object sync
+        # loop over the scrambled cells remains in Python.
+        max_rot = MAX_ROT_LUT[self.tile_type_arr]
+        rotations = (np.random.random(self.tile_type_arr.shape) * max_rot).astype(np.uint8)
+        scramble = ((self.tile_type_arr != TileType.EMPTY.value)
+                    & (self.tile_type_arr != TileType.POWER_SOURCE.value))
+        self.conn_mask[scramble] = CONN_LUT[self.tile_type_arr, rotations, 0][scramble]
+        for y, x in np.argwhere(scramble):
+            tile = self.grid[y][x]
+            tile.max_rotation = ROTATIONS[tile.tile_type]
+            tile.rotation = int(rotations[y, x])
+            tile.mask = int(self.conn_mask[y, x])
 
     def update_power_flow(self):
+        sources = np.array([y * self.width + x for x, y in self.power_sources], dtype=np.int32)
+        powered = _propagate(self.conn_mask.reshape(-1), self.neighbors,
+                             sources, self.height * self.width)
+        powered = powered.reshape(self.height, self.width)
+
         for y in range(self.height):
+            row = self.grid[y]
+            powered_row = powered[y]
             for x in range(self.width):
-                if self.grid[y][x].tile_type != TileType.POWER_SOURCE:
-                    self.grid[y][x].is_powered = False
-                self.grid[y][x].used_in_solution = False
-        
-        visited = set()
-        for source_x, source_y in self.power_sources:
-            queue = [(source_x, source_y)]
-            visited.add((source_x, source_y))
-            
-            while queue:
-                x, y = queue.pop(0)
-                current_tile = self.grid[y][x]
-                current_tile.is_powered = True
-                current_tile.used_in_solution = True
-                
-                for direction in current_tile.get_connections():
-                    nx, ny = self.get_neighbor_position(x, y, direction)
-                    
-                    if not self.is_valid_position(nx, ny) or (nx, ny) in visited:
-                        continue
-                    
-                    neighbor_tile = self.grid[ny][nx]
-                    opposite_dir = self.get_opposite_direction(direction)
-                    
-                    if neighbor_tile.is_connected_to(opposite_dir):
-                        queue.append((nx, ny))
-                        visited.add((nx, ny))
-        
-        all_bulbs_lit = all(self.grid[y][x].is_powered for x, y in self.bulbs)
-        all_pipes_used = all(
-            self.grid[y][x].used_in_solution or self.grid[y][x].tile_type == TileType.EMPTY
-            for y in range(self.height) for x in range(self.width)
-        )
-        no_leaks = self.check_no_leaks()
-        
+                on = powered_row[x] != 0
+                tile = row[x]
+                if tile.is_powered != on:
+                    tile.is_powered = on
+                    self._dirty.add((x, y))
+                tile.used_in_solution = on
+
+        all_bulbs_lit = bool(powered[self._bulbs_yx[:, 0], self._bulbs_yx[:, 1]].all())
+        all_pipes_used = bool(((powered != 0) | (self.tile_type_arr == TileType.EMPTY.value)).all())
+        no_leaks = self.check_no_leaks(powered)
+
         self.is_solved = all_bulbs_lit and all_pipes_used and no_leaks
         return self.is_solved
 
-    def check_no_leaks(self) -> bool:
-        for y in range(self.height):
-            for x in range(self.width):
-                tile = self.grid[y][x]
-                if tile.is_powered:
-                    for direction in tile.get_connections():
-                        nx, ny = self.get_neighbor_position(x, y, direction)
-                        if not self.is_valid_position(nx, ny):
-                            return False
-                        
-                        neighbor = self.grid[ny][nx]
-                        opposite_dir = self.get_opposite_direction(direction)
-                        
-                        if neighbor.tile_type == TileType.EMPTY or not neighbor.is_connected_to(opposite_dir):
-                            return False
-        return True
+    def check_no_leaks(self, powered) -> bool:
+        # Pack each row's connection nibbles into one uint64 word and test
+        # every cell's four directions against its neighbors with a handful
+        # of shifts per row instead of a per-cell, per-direction scan. A
+        # direction bit leaks when the powered cell's bit is set but the
+        # matching bit of the adjacent nibble (the neighbor's opposite
+        # direction) is not; off-board neighbors read as zero and therefore
+        # leak, as do EMPTY neighbors with their all-zero masks.
+        rows = np.bitwise_or.reduce(
+            self.conn_mask.astype(np.uint64) << self._nib_shifts, axis=1)
+        powered_rows = np.bitwise_or.reduce(
+            (powered.astype(np.uint64) * np.uint64(0xF)) << self._nib_shifts, axis=1)
 
-    def draw(self):
-        self.screen.fill(BACKGROUND_COLOR)
-        
-        for x in range(self.width + 1):
-            pygame.draw.line(self.screen, GRID_COLOR, 
-                            (x * TILE_SIZE, 0), 
-                            (x * TILE_SIZE, SCREEN_HEIGHT), 2)
-        
-        for y in range(self.height + 1):
-            pygame.draw.line(self.screen, GRID_COLOR, 
-                            (0, y * TILE_SIZE), 
-                            (SCREEN_WIDTH, y * TILE_SIZE), 2)
-        
-        for y in range(self.height):
-            for x in range(self.width):
-                tile = self.grid[y][x]
-                center_x = x * TILE_SIZE + TILE_SIZE // 2
-                center_y = y * TILE_SIZE + TILE_SIZE // 2
-                
-                if tile.tile_type == TileType.EMPTY:
-                    continue
-                
-                color = PIPE_COLOR if tile.is_powered else (100, 20, 20)
-                
-                if tile.tile_type == TileType.POWER_SOURCE:
-                    pygame.draw.rect(self.screen, POWER_SOURCE_COLOR, 
-                                    (x * TILE_SIZE + 10, y * TILE_SIZE + 10, 
-                                     TILE_SIZE - 20, TILE_SIZE - 20))
-                    
-                    indicator_size = 10
-                    for direction in tile.get_connections():
-                        indicator_color = POWER_INDICATOR_COLOR
-                        
-                        if direction == Direction.UP:
-                            pygame.draw.polygon(self.screen, indicator_color, [
+        above = np.zeros_like(rows)
+        above[1:] = rows[:-1]
+        below = np.zeros_like(rows)
+        below[:-1] = rows[1:]
+
+        # Shift the partner bit (the neighbor's opposite direction) into
+        # the same lane position as the bit under test: DOWN of the row
+        # above lands on UP two bit positions away, and LEFT/RIGHT partners
+        # live one nibble (4 bits) plus 2 bit positions over.
+        leak = (rows & ~(above >> np.uint64(2))) & self._lane_up
+        leak |= (rows & ~(below << np.uint64(2))) & self._lane_down
+        leak |= (rows & ~(rows >> np.uint64(6))) & self._lane_right
+        leak |= (rows & ~(rows << np.uint64(6))) & self._lane_left
+        return not bool((leak & powered_rows).any())
+
+    def _render_tile(self, tile: Tile) -> pygame.Surface:
+        # Render one tile at local coordinates onto a transparent surface.
+        # The result is cached per (tile_type, mask, powered) combination, so
+        # this runs only a handful of times per session.
+        surf = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
+        center_x = TILE_SIZE // 2
+        center_y = TILE_SIZE // 2
+
+        color = PIPE_COLOR if tile.is_powered else (100, 20, 20)
+
+        if tile.tile_type == TileType.POWER_SOURCE:
+            pygame.draw.rect(surf, POWER_SOURCE_COLOR,
+                            (10, 10, TILE_SIZE - 20, TILE_SIZE - 20))
+
+            indicator_size = 10
+            for direction in tile.get_connections():
+                indicator_color = POWER_INDICATOR_COLOR
+
+                if direction == Direction.UP:
+                    pygame.draw.polygon(surf, indicator_color, [
+                        (center_x, center_y - TILE_SIZE//4),
+                        (center_x - indicator_size, center_y - indicator_size),
+                        (center_x + indicator_size, center_y - indicator_size)
+                    ])
+                elif direction == Direction.RIGHT:
+                    pygame.draw.polygon(surf, indicator_color, [
+                        (center_x + TILE_SIZE//4, center_y),
+                        (center_x + indicator_size, center_y - indicator_size),
+                        (center_x + indicator_size, center_y + indicator_size)
+                    ])
+                elif direction == Direction.DOWN:
+                    pygame.draw.polygon(surf, indicator_color, [
+                        (center_x, center_y + TILE_SIZE//4),
+                        (center_x - indicator_size, center_y + indicator_size),
+                        (center_x + indicator_size, center_y + indicator_size)
+                    ])
+                elif direction == Direction.LEFT:
+                    pygame.draw.polygon(surf, indicator_color, [
+                        (center_x - TILE_SIZE//4, center_y),
+                        (center_x - indicator_size, center_y - indicator_size),
+                        (center_x - indicator_size, center_y + indicator_size)
+                    ])
+
+        elif tile.tile_type == TileType.LIGHT_BULB:
+            bulb_color = BULB_COLOR if tile.is_powered else BULB_OFF_COLOR
+            pygame.draw.circle(surf, bulb_color,
+                              (center_x, center_y), TILE_SIZE // 3)
+
+            connection = tile.get_connections()[0]
+            connection_width = 5
+            conn_length = TILE_SIZE // 2.5
+            conn_color = (200, 100, 50) if tile.is_powered else (100, 50, 25)
+
+            socket_size = TILE_SIZE // 5
+            socket_color = (80, 80, 80) if tile.is_powered else (60, 60, 60)
+
+            if connection == Direction.UP:
+                pygame.draw.rect(surf, socket_color,
+                                (center_x - socket_size//2, center_y - TILE_SIZE//3 - socket_size,
+                                 socket_size, socket_size))
+                pygame.draw.line(surf, conn_color,
                                 (center_x, center_y - TILE_SIZE//4),
-                                (center_x - indicator_size, center_y - indicator_size),
-                                (center_x + indicator_size, center_y - indicator_size)
-                            ])
-                        elif direction == Direction.RIGHT:
-                            pygame.draw.polygon(self.screen, indicator_color, [
+                                (center_x, center_y - conn_length), connection_width)
+            elif connection == Direction.RIGHT:
+                pygame.draw.rect(surf, socket_color,
+                                (center_x + TILE_SIZE//3, center_y - socket_size//2,
+                                 socket_size, socket_size))
+                pygame.draw.line(surf, conn_color,
                                 (center_x + TILE_SIZE//4, center_y),
-                                (center_x + indicator_size, center_y - indicator_size),
-                                (center_x + indicator_size, center_y + indicator_size)
-                            ])
-                        elif direction == Direction.DOWN:
-                            pygame.draw.polygon(self.screen, indicator_color, [
+                                (center_x + conn_length, center_y), connection_width)
+            elif connection == Direction.DOWN:
+                pygame.draw.rect(surf, socket_color,
+                                (center_x - socket_size//2, center_y + TILE_SIZE//3,
+                                 socket_size, socket_size))
+                pygame.draw.line(surf, conn_color,
                                 (center_x, center_y + TILE_SIZE//4),
-                                (center_x - indicator_size, center_y + indicator_size),
-                                (center_x + indicator_size, center_y + indicator_size)
-                            ])
-                        elif direction == Direction.LEFT:
-                            pygame.draw.polygon(self.screen, indicator_color, [
+                                (center_x, center_y + conn_length), connection_width)
+            elif connection == Direction.LEFT:
+                pygame.draw.rect(surf, socket_color,
+                                (center_x - TILE_SIZE//3 - socket_size, center_y - socket_size//2,
+                                 socket_size, socket_size))
+                pygame.draw.line(surf, conn_color,
                                 (center_x - TILE_SIZE//4, center_y),
-                                (center_x - indicator_size, center_y - indicator_size),
-                                (center_x - indicator_size, center_y + indicator_size)
-                            ])
-                
-                elif tile.tile_type == TileType.LIGHT_BULB:
-                    bulb_color = BULB_COLOR if tile.is_powered else BULB_OFF_COLOR
-                    pygame.draw.circle(self.screen, bulb_color, 
-                                      (center_x, center_y), TILE_SIZE // 3)
-                    
-                    connection = tile.get_connections()[0]
-                    connection_width = 5
-                    conn_length = TILE_SIZE // 2.5
-                    conn_color = (200, 100, 50) if tile.is_powered else (100, 50, 25)
-                    
-                    socket_size = TILE_SIZE // 5
-                    socket_color = (80, 80, 80) if tile.is_powered else (60, 60, 60)
-                    
-                    if connection == Direction.UP:
-                        pygame.draw.rect(self.screen, socket_color,
-                                        (center_x - socket_size//2, center_y - TILE_SIZE//3 - socket_size, 
-                                         socket_size, socket_size))
-                        pygame.draw.line(self.screen, conn_color, 
-                                        (center_x, center_y - TILE_SIZE//4), 
-                                        (center_x, center_y - conn_length), connection_width)
-                    elif connection == Direction.RIGHT:
-                        pygame.draw.rect(self.screen, socket_color,
-                                        (center_x + TILE_SIZE//3, center_y - socket_size//2, 
-                                         socket_size, socket_size))
-                        pygame.draw.line(self.screen, conn_color, 
-                                        (center_x + TILE_SIZE//4, center_y), 
-                                        (center_x + conn_length, center_y), connection_width)
-                    elif connection == Direction.DOWN:
-                        pygame.draw.rect(self.screen, socket_color,
-                                        (center_x - socket_size//2, center_y + TILE_SIZE//3, 
-                                         socket_size, socket_size))
-                        pygame.draw.line(self.screen, conn_color, 
-                                        (center_x, center_y + TILE_SIZE//4), 
-                                        (center_x, center_y + conn_length), connection_width)
-                    elif connection == Direction.LEFT:
-                        pygame.draw.rect(self.screen, socket_color,
-                                        (center_x - TILE_SIZE//3 - socket_size, center_y - socket_size//2, 
-                                         socket_size, socket_size))
-                        pygame.draw.line(self.screen, conn_color, 
-                                        (center_x - TILE_SIZE//4, center_y), 
-                                        (center_x - conn_length, center_y), connection_width)
-                    
-                    if tile.is_powered:
-                        for r in range(5, 15, 5):
-                            pygame.draw.circle(self.screen, (255, 255, 200, 100 - r * 6), 
-                                              (center_x, center_y), TILE_SIZE // 3 + r, 1)
-                
-                else:
-                    connections = tile.get_connections()
-                    
-                    for direction in connections:
-                        if direction == Direction.UP:
-                            pygame.draw.line(self.screen, color, 
-                                            (center_x, center_y), 
-                                            (center_x, y * TILE_SIZE), 4)
-                        elif direction == Direction.RIGHT:
-                            pygame.draw.line(self.screen, color, 
-                                            (center_x, center_y), 
-                                            ((x + 1) * TILE_SIZE, center_y), 4)
-                        elif direction == Direction.DOWN:
-                            pygame.draw.line(self.screen, color, 
-                                            (center_x, center_y), 
-                                            (center_x, (y + 1) * TILE_SIZE), 4)
-                        elif direction == Direction.LEFT:
-                            pygame.draw.line(self.screen, color, 
-                                            (center_x, center_y), 
-                                            (x * TILE_SIZE, center_y), 4)
-                    
-                    pygame.draw.circle(self.screen, color, (center_x, center_y), 6)
-        
-        if self.is_solved:
-            win_text = self.font.render("Puzzle Solved!", True, (0, 100, 0))
-            text_rect = win_text.get_rect(center=(SCREEN_WIDTH // 2, 30))
-            pygame.draw.rect(self.screen, (200, 255, 200), 
-                           (text_rect.x - 10, text_rect.y - 5, 
-                            text_rect.width + 20, text_rect.height + 10))
-            self.screen.blit(win_text, text_rect)
+                                (center_x - conn_length, center_y), connection_width)
+
+            if tile.is_powered:
+                for r in range(5, 15, 5):
+                    pygame.draw.circle(surf, (255, 255, 200, 100 - r * 6),
+                                      (center_x, center_y), TILE_SIZE // 3 + r, 1)
+
+        else:
+            for direction in tile.get_connections():
+                if direction == Direction.UP:
+                    pygame.draw.line(surf, color,
+                                    (center_x, center_y),
+                                    (center_x, 0), 4)
+                elif direction == Direction.RIGHT:
+                    pygame.draw.line(surf, color,
+                                    (center_x, center_y),
+                                    (TILE_SIZE, center_y), 4)
+                elif direction == Direction.DOWN:
+                    pygame.draw.line(surf, color,
+                                    (center_x, center_y),
+                                    (center_x, TILE_SIZE), 4)
+                elif direction == Direction.LEFT:
+                    pygame.draw.line(surf, color,
+                                    (center_x, center_y),
+                                    (0, center_y), 4)
+
+            pygame.draw.circle(surf, color, (center_x, center_y), 6)
+
+        return surf
+
+    def _blit_tile(self, x: int, y: int):
+        tile = self.grid[y][x]
+        if tile.tile_type == TileType.EMPTY:
+            return
+        key = (tile.tile_type, tile.mask, tile.is_powered)
+        surf = self._tile_cache.get(key)
+        if surf is None:
+            surf = self._render_tile(tile)
+            self._tile_cache[key] = surf
+        self.screen.blit(surf, (x * TILE_SIZE, y * TILE_SIZE))
+
+    def draw(self):
+        # The game is event-driven: between clicks nothing changes, and a
+        # click only affects the rotated tile plus tiles whose powered state
+        # flipped. Repaint just those cells over the pre-rendered background
+        # and push the dirty rects; a full repaint happens only on the first
+        # frame, after regeneration, or when the solved banner toggles.
+        if self.is_solved != self._solved_shown:
+            self._needs_full_redraw = True
+
+        if self._needs_full_redraw:
+            self.screen.blit(self._bg, (0, 0))
+            for y in range(self.height):
+                for x in range(self.width):
+                    self._blit_tile(x, y)
+
+            if self.is_solved:
+                win_text = self.font.render("Puzzle Solved!", True, (0, 100, 0))
+                text_rect = win_text.get_rect(center=(SCREEN_WIDTH // 2, 30))
+                pygame.draw.rect(self.screen, (200, 255, 200),
+                               (text_rect.x - 10, text_rect.y - 5,
+                                text_rect.width + 20, text_rect.height + 10))
+                self.screen.blit(win_text, text_rect)
+
+            pygame.display.flip()
+            self._needs_full_redraw = False
+            self._solved_shown = self.is_solved
+            self._dirty.clear()
+            return
+
+        rects = []
+        for x, y in self._dirty:
+            rect = pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+            self.screen.blit(self._bg, rect, rect)
+            self._blit_tile(x, y)
+            rects.append(rect)
+        self._dirty.clear()
+
+        if rects:
+            pygame.display.update(rects)
 
     def handle_click(self, pos):
         x, y = pos[0] // TILE_SIZE, pos[1] // TILE_SIZE
@@ -541,36 +722,47 @@ class PuzzleGame:
             return
         
         if self.grid[y][x].rotate():
+            self._dirty.add((x, y))
             self.update_power_flow()
 
 def main():
     game = PuzzleGame(GRID_SIZE[0], GRID_SIZE[1])
     game.generate_puzzle(difficulty=1)
-    
+    game.draw()
+
     running = True
-    clock = pygame.time.Clock()
-    
+
     while running:
-        for event in pygame.event.get():
+        # The board only changes in response to input, so block until an
+        # event arrives instead of polling at 30 FPS, and redraw only when
+        # something mutated the game state.
+        events = [pygame.event.wait()] + pygame.event.get()
+        needs_redraw = False
+
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:
                     game.handle_click(event.pos)
+                    needs_redraw = True
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r:
                     game.generate_puzzle(difficulty=1)
+                    needs_redraw = True
                 elif event.key == pygame.K_1:
                     game.generate_puzzle(difficulty=2)
+                    needs_redraw = True
                 elif event.key == pygame.K_2:
                     game.generate_puzzle(difficulty=4)
+                    needs_redraw = True
                 elif event.key == pygame.K_3:
                     game.generate_puzzle(difficulty=6)
-        
-        game.draw()
-        pygame.display.flip()
-        clock.tick(30)
-    
+                    needs_redraw = True
+
+        if needs_redraw:
+            game.draw()
+
     pygame.quit()
     sys.exit()
 